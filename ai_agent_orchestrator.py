@@ -5,40 +5,284 @@ Uses Google AI Platform agents to automatically handle deployments, fixes, and m
 """
 
 import asyncio
-import json
+import datetime
+import hashlib
 import logging
-from typing import Dict, List, Any
-from google import genai
-from google.cloud import aiplatform, run_v2, monitoring_v3, functions_v1
+import math
+import os
+import random
+import re
+import sqlite3
+import tarfile
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Optional, Tuple
+from urllib.parse import urlparse
+import aiohttp
+import orjson
+import google.auth
+import google.generativeai as genai
+from google.api_core import exceptions as gcp_exceptions, grpc_helpers
+from googleapiclient import discovery
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from google.cloud import aiplatform, run_v2, monitoring_v3, functions_v1, pubsub_v1
 from google.cloud import secretmanager
-import subprocess
+from google.cloud.monitoring_v3.services.metric_service.transports import MetricServiceGrpcTransport
+from google.cloud.monitoring_v3.services.notification_channel_service.transports import (
+    NotificationChannelServiceGrpcTransport
+)
 import time
+from deploy_utils import LogRingBuffer, SourceIgnore, error_signature, source_digest
+from file_utils import run, write_if_changed
+
+try:
+    from google.cloud import artifactregistry_v1, cloudbuild_v1, storage
+except ImportError:  # Fall back to the gcloud CLI for source builds
+    artifactregistry_v1 = cloudbuild_v1 = storage = None
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+CACHE_MIN_TTL = 60  # Cached responses are kept at least this many seconds
+MONITORING_MAX_STALENESS = 300  # Health-check anyway if no alert arrives within this many seconds
+HEALTH_CHECK_INTERVAL = 60  # Polling bound while alerts can't be delivered to the topic
+MONITORING_NOTIFICATION_AGENT = "service-{project_number}@gcp-sa-monitoring-notification.iam.gserviceaccount.com"
+DEPLOY_TIMEOUT = 600
+MAX_DEPLOY_ATTEMPTS = 5
+FIX_HISTORY_SIZE = 128
+SERVICE_URL_RE = re.compile(r'https://[\w.-]+\.run\.app')
+LISTEN_CALL_RE = re.compile(r"\b(\w+)\.listen\(\s*([^,)]+?)\s*(?=[,)])")
+BATCH_MAX_SUBREQUESTS = 20  # Keep each multipart batch within per-connection concurrency quotas
+BUILD_CACHE_PATH = ".deploy-cache/digest"
+SOURCE_REPOSITORY = "cloud-run-source-deploy"
+GCP_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+GRPC_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.max_concurrent_streams", 256),
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+]
+
+# Fix actions the fix agent can call; each maps to a handler in AIAgentOrchestrator.fix_handlers
+FIX_TOOLS = genai.protos.Tool(function_declarations=[
+    genai.protos.FunctionDeclaration(
+        name="apply_port_fix",
+        description="Make server.js listen on the PORT environment variable that Cloud Run provides",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={"default_port": genai.protos.Schema(
+                type=genai.protos.Type.INTEGER, description="Port to use when PORT is unset"
+            )}
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="update_package_json_start_script",
+        description="Set the start and dev scripts in package.json",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={"start_command": genai.protos.Schema(
+                type=genai.protos.Type.STRING, description="Command that starts the server, e.g. 'node server.js'"
+            )}
+        )
+    ),
+    genai.protos.FunctionDeclaration(
+        name="report_manual_fix",
+        description="Describe a fix that none of the other actions can apply automatically",
+        parameters=genai.protos.Schema(
+            type=genai.protos.Type.OBJECT,
+            properties={"summary": genai.protos.Schema(type=genai.protos.Type.STRING)},
+            required=["summary"]
+        )
+    ),
+])
+FIX_TOOL_CONFIG = {"function_calling_config": {"mode": "ANY"}}
+# How a diagnosis refers to each file-changing fix action; a speculative fix is only
+# applied as drafted when the diagnosis backs every file change in it
+FIX_ACTION_HINTS = {
+    "apply_port_fix": re.compile(r"\bport\b", re.I),
+    "update_package_json_start_script": re.compile(r"package\.json|start script|npm start", re.I),
+}
+
+
+@dataclass(frozen=True)
+class Agent:
+    """A configured AI agent and the model client built for it"""
+    __slots__ = ("name", "model", "system_prompt", "tools", "model_obj")
+
+    name: str
+    model: str
+    system_prompt: str
+    tools: Tuple[str, ...]
+    model_obj: Any
+
+
+class DeploymentError(Exception):
+    """Build or rollout failure, carrying the logs the diagnostic agent should see"""
+
+    def __init__(self, logs: str):
+        super().__init__(logs)
+        self.logs = logs
+
+
+class GeminiResponseCache:
+    """Two-tier cache for agent responses: exact prompt hash, then embedding similarity"""
+
+    def __init__(self, path: str = ".deploy-cache/gemini_responses.sqlite3", ttl: int = 3600,
+                 semantic: bool = True, similarity_threshold: float = 0.92):
+        self.ttl = max(ttl, CACHE_MIN_TTL)
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding TEXT,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    @staticmethod
+    def _scope(agent_name: str, model: str, system_prompt: str, semantic_scope: str) -> str:
+        """Semantic matches are only valid between prompts sent to the same agent about the same subject"""
+        return hashlib.sha256(
+            f"{agent_name}\x00{model}\x00{system_prompt}\x00{semantic_scope}".encode()
+        ).hexdigest()
+
+    @staticmethod
+    def _key(scope: str, prompt: str) -> str:
+        return hashlib.sha256(f"{scope}\x00{prompt}".encode()).hexdigest()
+
+    async def get(self, agent_name: str, model: str, system_prompt: str, prompt: str,
+                  semantic_scope: Optional[str] = None) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Return (cached response or None, the prompt's embedding if one was computed)
+
+        Near matches are only looked up when a semantic_scope (e.g. the service name) is
+        given, and only among prompts with the same scope. Leave it unset for prompts that
+        embed logs or health data: a near match there can be a different failure.
+        """
+        now = time.time()
+        scope = self._scope(agent_name, model, system_prompt, semantic_scope or "")
+
+        row = self.db.execute(
+            "SELECT response FROM responses WHERE key = ? AND expires_at > ?",
+            (self._key(scope, prompt), now)
+        ).fetchone()
+        if row:
+            self.logger.info(f"💾 Exact cache hit for {agent_name}")
+            return row[0], None
+
+        if not (self.semantic and semantic_scope):
+            return None, None
+
+        embedding = await self._embed(prompt)
+        if embedding is None:
+            return None, None
+
+        best_score, best_response = 0.0, None
+        for response, stored in self.db.execute(
+            "SELECT response, embedding FROM responses WHERE scope = ? AND expires_at > ? AND embedding IS NOT NULL",
+            (scope, now)
+        ):
+            score = self._cosine(embedding, orjson.loads(stored))
+            if score > best_score:
+                best_score, best_response = score, response
+
+        if best_score >= self.similarity_threshold:
+            self.logger.info(f"💾 Semantic cache hit for {agent_name} (similarity {best_score:.3f})")
+            return best_response, embedding
+        return None, embedding
+
+    def put(self, agent_name: str, model: str, system_prompt: str, prompt: str, response: str,
+            embedding: Optional[List[float]] = None, semantic_scope: Optional[str] = None):
+        """Store a response for this prompt, with the embedding get() computed for semantic lookups"""
+        scope = self._scope(agent_name, model, system_prompt, semantic_scope or "")
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses (key, scope, response, embedding, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (self._key(scope, prompt), scope, response,
+             orjson.dumps(embedding) if embedding is not None else None, time.time() + self.ttl)
+        )
+        self.db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        self.db.commit()
+
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed a prompt for the semantic tier; failures just disable it for this lookup"""
+        try:
+            result = await genai.embed_content_async(model=EMBEDDING_MODEL, content=text)
+            return result["embedding"]
+        except Exception as e:
+            self.logger.warning(f"Embedding failed, skipping semantic cache: {e}")
+            return None
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
 
 class AIAgentOrchestrator:
     def __init__(self, project_id: str, region: str = "us-central1"):
         self.project_id = project_id
         self.region = region
-        self.client = aiplatform.gapic.PipelineServiceClient()
-        self.run_client = run_v2.ServicesClient()
-        self.monitoring_client = monitoring_v3.MetricServiceClient()
         
-        # Initialize AI agents
-        self.agents = {
-            "deployment_agent": self._create_deployment_agent(),
-            "diagnostic_agent": self._create_diagnostic_agent(), 
-            "fix_agent": self._create_fix_agent(),
-            "monitoring_agent": self._create_monitoring_agent()
+        # One credential set (and token refresher) for every client, and one
+        # multiplexed gRPC channel for the clients that talk to the same host
+        self.credentials, _ = google.auth.default(scopes=GCP_SCOPES)
+        monitoring_channel = grpc_helpers.create_channel(
+            "monitoring.googleapis.com:443", credentials=self.credentials, scopes=GCP_SCOPES, options=GRPC_CHANNEL_OPTIONS
+        )
+        
+        self.client = aiplatform.gapic.PipelineServiceClient(credentials=self.credentials)
+        self.run_client = run_v2.ServicesClient(credentials=self.credentials)
+        self.build_client = cloudbuild_v1.CloudBuildClient(credentials=self.credentials) if cloudbuild_v1 else None
+        self.storage_client = storage.Client(project=project_id, credentials=self.credentials) if storage else None
+        self.artifact_client = (
+            artifactregistry_v1.ArtifactRegistryClient(credentials=self.credentials) if artifactregistry_v1 else None
+        )
+        self.monitoring_client = monitoring_v3.MetricServiceClient(
+            transport=MetricServiceGrpcTransport(channel=monitoring_channel)
+        )
+        self.monitoring_api = discovery.build("monitoring", "v3", credentials=self.credentials, cache_discovery=False)
+        self.resource_manager_api = discovery.build(
+            "cloudresourcemanager", "v3", credentials=self.credentials, cache_discovery=False
+        )
+        self.notification_client = monitoring_v3.NotificationChannelServiceClient(
+            transport=NotificationChannelServiceGrpcTransport(channel=monitoring_channel)
+        )
+        self.publisher = pubsub_v1.PublisherClient(credentials=self.credentials)
+        self.subscriber = pubsub_v1.SubscriberClient(credentials=self.credentials)
+        self.response_cache = GeminiResponseCache()
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        self.fix_handlers = {
+            "apply_port_fix": self._fix_port,
+            "update_package_json_start_script": self._fix_start_script,
+            "report_manual_fix": self._report_manual_fix,
         }
+        self.attempted_fixes: "OrderedDict[str, set]" = OrderedDict()
+        self.alert_delivery: set = set()  # Services whose alert topic Cloud Monitoring can publish to
         
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
+        
+        # Initialize AI agents
+        self.deployment_agent = self._create_deployment_agent()
+        self.diagnostic_agent = self._create_diagnostic_agent()
+        self.fix_agent = self._create_fix_agent()
+        self.monitoring_agent = self._create_monitoring_agent()
 
     def _create_deployment_agent(self):
         """AI Agent specialized in deployment tasks"""
-        return {
-            "name": "DeploymentSpecialist",
-            "model": "gemini-1.5-pro",
-            "system_prompt": """
+        return self._build_agent(
+            name="DeploymentSpecialist",
+            model="gemini-1.5-pro",
+            system_prompt="""
             You are a deployment specialist AI agent. Your job is to:
             1. Analyze deployment configurations
             2. Generate optimized Cloud Run deployment commands
@@ -48,15 +292,15 @@ class AIAgentOrchestrator:
             Always provide specific, executable commands and configurations.
             Focus on reliability, security, and performance.
             """,
-            "tools": ["cloud_run", "cloud_build", "container_registry"]
-        }
+            tools=("cloud_run", "cloud_build", "container_registry")
+        )
 
     def _create_diagnostic_agent(self):
         """AI Agent for diagnosing deployment issues"""
-        return {
-            "name": "DiagnosticExpert", 
-            "model": "gemini-1.5-pro",
-            "system_prompt": """
+        return self._build_agent(
+            name="DiagnosticExpert", 
+            model="gemini-1.5-pro",
+            system_prompt="""
             You are a diagnostic expert AI agent. Your job is to:
             1. Analyze deployment logs and errors
             2. Identify root causes of failures
@@ -65,15 +309,15 @@ class AIAgentOrchestrator:
             
             Parse logs systematically and provide actionable insights.
             """,
-            "tools": ["log_analysis", "error_detection", "performance_metrics"]
-        }
+            tools=("log_analysis", "error_detection", "performance_metrics")
+        )
 
     def _create_fix_agent(self):
         """AI Agent for automatically fixing common issues"""
-        return {
-            "name": "AutoFixer",
-            "model": "gemini-1.5-pro", 
-            "system_prompt": """
+        return self._build_agent(
+            name="AutoFixer",
+            model="gemini-1.5-pro", 
+            system_prompt="""
             You are an auto-fix specialist AI agent. Your job is to:
             1. Generate code fixes for common deployment issues
             2. Update configurations automatically
@@ -82,15 +326,16 @@ class AIAgentOrchestrator:
             
             Provide safe, tested solutions. Always backup before making changes.
             """,
-            "tools": ["code_gen", "config_update", "testing", "git_ops"]
-        }
+            tools=("code_gen", "config_update", "testing", "git_ops"),
+            function_tools=(FIX_TOOLS,)
+        )
 
     def _create_monitoring_agent(self):
         """AI Agent for continuous monitoring and alerting"""
-        return {
-            "name": "MonitoringGuard",
-            "model": "gemini-1.5-pro",
-            "system_prompt": """
+        return self._build_agent(
+            name="MonitoringGuard",
+            model="gemini-1.5-pro",
+            system_prompt="""
             You are a monitoring specialist AI agent. Your job is to:
             1. Set up comprehensive monitoring and alerting
             2. Analyze performance metrics and trends
@@ -99,66 +344,352 @@ class AIAgentOrchestrator:
             
             Focus on proactive monitoring and intelligent alerting.
             """,
-            "tools": ["monitoring_setup", "alerting", "predictive_analysis"]
-        }
+            tools=("monitoring_setup", "alerting", "predictive_analysis")
+        )
+
+    def _build_agent(self, name: str, model: str, system_prompt: str, tools: Tuple[str, ...],
+                     function_tools: Tuple[Any, ...] = ()) -> Agent:
+        """Build an agent with its model client constructed once up front"""
+        return Agent(
+            name=name,
+            model=model,
+            system_prompt=system_prompt,
+            tools=tools,
+            model_obj=self._create_model(model, system_prompt, function_tools)
+        )
+
+    def _create_model(self, model: str, system_prompt: str, function_tools: Tuple[Any, ...]):
+        """Build the agent's model once; the system prompt travels as system_instruction, not per prompt"""
+        if function_tools:
+            return genai.GenerativeModel(
+                model, system_instruction=system_prompt,
+                tools=list(function_tools), tool_config=FIX_TOOL_CONFIG
+            )
+        return genai.GenerativeModel(model, system_instruction=system_prompt)
+
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session so health checks reuse pooled keep-alive connections"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession()
+        return self._http_session
+
+    async def close(self):
+        """Release the shared HTTP session"""
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
 
     async def orchestrate_deployment(self, service_name: str, source_path: str):
         """Main orchestration method that coordinates all AI agents"""
         self.logger.info(f"🤖 Starting AI-orchestrated deployment for {service_name}")
+        monitoring_plan = None
         
         try:
             # Step 1: Deployment Agent analyzes and prepares
             deployment_plan = await self._get_agent_response(
-                "deployment_agent",
-                f"Analyze the service '{service_name}' and create an optimal deployment plan. Source: {source_path}"
+                self.deployment_agent,
+                f"Analyze the service '{service_name}' and create an optimal deployment plan. Source: {source_path}",
+                semantic_scope=service_name
             )
             
-            # Step 2: Execute deployment
-            deployment_result = await self._execute_deployment(service_name, source_path, deployment_plan)
+            # Ask for the monitoring plan now so it is ready by the time the deploy finishes
+            monitoring_plan = asyncio.create_task(
+                self._get_agent_response(
+                    self.monitoring_agent, self._monitoring_prompt(service_name), semantic_scope=service_name
+                )
+            )
             
-            if deployment_result.get("success"):
-                self.logger.info("✅ Deployment successful!")
+            for attempt in range(MAX_DEPLOY_ATTEMPTS):
+                if attempt:
+                    # Back off between retries so repeated failures don't hammer Cloud Build quotas
+                    self.logger.info("🔄 Retrying deployment with applied fixes...")
+                    await asyncio.sleep(min(2 ** attempt, 60) + random.random())
                 
-                # Step 3: Setup monitoring
-                await self._setup_monitoring(service_name)
-                return {"status": "success", "url": deployment_result.get("url")}
-            else:
-                # Step 4: Diagnostic agent analyzes failure
+                # Step 2: Execute deployment
+                deployment_result = await self._execute_deployment(service_name, source_path, deployment_plan)
+                
+                if deployment_result.get("success"):
+                    self.logger.info("✅ Deployment successful!")
+                    
+                    # Step 3: Setup monitoring
+                    await self._setup_monitoring(service_name, deployment_result.get("url"), monitoring_plan)
+                    return {"status": "success", "url": deployment_result.get("url")}
+                
+                # Step 4: Diagnostic agent analyzes failure while the fix agent
+                # speculatively drafts (but doesn't apply) a fix straight from the logs
                 self.logger.info("🔍 Deployment failed, running diagnostics...")
-                diagnostic_result = await self._run_diagnostics(deployment_result.get("logs", ""))
+                logs = deployment_result.get("logs", "")
+                diagnostic_result, speculative_calls = await asyncio.gather(
+                    self._run_diagnostics(logs),
+                    self._draft_speculative_fix(logs)
+                )
                 
                 # Step 5: Auto-fix agent attempts repair
-                fix_result = await self._attempt_auto_fix(service_name, diagnostic_result)
+                fix_result = await self._attempt_auto_fix(
+                    service_name, source_path, diagnostic_result, speculative_calls
+                )
                 
-                if fix_result.get("fixed"):
-                    # Retry deployment with fixes
-                    return await self._retry_deployment(service_name, source_path)
-                else:
+                # Only retry if this attempt changed something not already tried for the same failure
+                new_fixes = self._untried_fixes(error_signature(logs), fix_result.get("changes", []))
+                if not fix_result.get("fixed") or not new_fixes:
                     return {"status": "failed", "diagnostics": diagnostic_result, "attempted_fixes": fix_result}
+            
+            return {
+                "status": "failed",
+                "message": f"Deployment still failing after {MAX_DEPLOY_ATTEMPTS} attempts",
+                "diagnostics": diagnostic_result,
+                "attempted_fixes": fix_result
+            }
                     
         except Exception as e:
             self.logger.error(f"Orchestration failed: {e}")
             return {"status": "error", "message": str(e)}
+        finally:
+            # Drop the prefetched plan if the deploy never succeeded
+            if monitoring_plan is not None:
+                monitoring_plan.cancel()
 
-    async def _get_agent_response(self, agent_name: str, prompt: str) -> Dict[str, Any]:
-        """Get response from a specific AI agent"""
-        agent = self.agents[agent_name]
-        
-        # Use Google's Gemini API
-        model = genai.GenerativeModel(agent["model"])
+    def _untried_fixes(self, signature: str, changes: List[str]) -> List[str]:
+        """Filter out fixes already attempted for this failure signature, remembering the rest"""
+        tried = self.attempted_fixes.pop(signature, set())
+        untried = [change for change in changes if change not in tried]
+        tried.update(changes)
         
-        full_prompt = f"{agent['system_prompt']}\n\nTask: {prompt}"
+        # Most recently seen failures last; evict the oldest beyond the cap
+        self.attempted_fixes[signature] = tried
+        while len(self.attempted_fixes) > FIX_HISTORY_SIZE:
+            self.attempted_fixes.popitem(last=False)
+        return untried
+
+    async def _get_agent_response(self, agent: Agent, prompt: str,
+                                  semantic_scope: Optional[str] = None) -> Dict[str, Any]:
+        """Get response from a specific AI agent; a semantic_scope allows near-duplicate cache hits within it"""
+        cached, embedding = await self.response_cache.get(
+            agent.name, agent.model, agent.system_prompt, prompt, semantic_scope=semantic_scope
+        )
+        if cached is not None:
+            return {"agent": agent.name, "response": cached, "confidence": None, "cached": True}
         
-        response = await model.generate_content_async(full_prompt)
+        # Use Google's Gemini API
+        response = await agent.model_obj.generate_content_async(prompt)
+        self.response_cache.put(
+            agent.name, agent.model, agent.system_prompt, prompt, response.text, embedding, semantic_scope
+        )
         
         return {
-            "agent": agent_name,
+            "agent": agent.name,
             "response": response.text,
             "confidence": getattr(response, 'safety_ratings', None)
         }
 
+    async def _stream_fix_calls(self, prompt: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream the fix agent's function calls as (name, args) as soon as each arrives"""
+        agent = self.fix_agent
+        
+        # Exact hits only: fix prompts embed logs, and a near match may be a different failure
+        cached, _ = await self.response_cache.get(agent.name, agent.model, agent.system_prompt, prompt)
+        if cached is not None:
+            for call in orjson.loads(cached):
+                yield call["name"], call["args"]
+            return
+        
+        response = await agent.model_obj.generate_content_async(prompt, stream=True)
+        calls = []
+        async for chunk in response:
+            for part in chunk.parts:
+                if part.function_call.name:
+                    call = {"name": part.function_call.name, "args": dict(part.function_call.args)}
+                    calls.append(call)
+                    yield call["name"], call["args"]
+        
+        self.response_cache.put(agent.name, agent.model, agent.system_prompt, prompt, orjson.dumps(calls).decode())
+
     async def _execute_deployment(self, service_name: str, source_path: str, plan: Dict) -> Dict:
         """Execute the deployment based on AI agent's plan"""
+        if self.build_client is None or self.storage_client is None or self.artifact_client is None:
+            return await self._execute_gcloud_deployment(service_name, source_path)
+        
+        try:
+            # Skip the build when the source tree matches the last image built for this service
+            digest = await asyncio.to_thread(source_digest, source_path)
+            image = self._cached_image(service_name, digest)
+            if image:
+                self.logger.info(f"♻️ Source unchanged, redeploying {image}")
+            else:
+                # Build and deploy in-process over the API clients' existing channels
+                image = await asyncio.to_thread(self._build_image, service_name, source_path)
+                self._store_built_image(service_name, digest, image)
+            service = await asyncio.to_thread(self._deploy_image, service_name, image)
+            return {"success": True, "url": service.uri, "logs": f"Deployed {image} as {service.latest_ready_revision}"}
+        except DeploymentError as e:
+            return {"success": False, "logs": e.logs}
+        except Exception as e:
+            return {"success": False, "logs": f"Deployment error: {str(e)}"}
+
+    def _load_build_cache(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(BUILD_CACHE_PATH, "rb") as f:
+                return orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return {}
+
+    def _cached_image(self, service_name: str, digest: str) -> Optional[str]:
+        """Image previously built from this exact source digest, if any"""
+        entry = self._load_build_cache().get(f"{service_name}:{self.region}", {})
+        return entry.get("image") if entry.get("digest") == digest else None
+
+    def _store_built_image(self, service_name: str, digest: str, image: str):
+        cache = self._load_build_cache()
+        cache[f"{service_name}:{self.region}"] = {"digest": digest, "image": image}
+        os.makedirs(os.path.dirname(BUILD_CACHE_PATH), exist_ok=True)
+        with open(BUILD_CACHE_PATH, "wb") as f:
+            f.write(orjson.dumps(cache, option=orjson.OPT_INDENT_2))
+
+    def _build_image(self, service_name: str, source_path: str) -> str:
+        """Upload the source tree and build it into a container image with Cloud Build"""
+        tag = int(time.time())
+        image = f"{self.region}-docker.pkg.dev/{self.project_id}/{SOURCE_REPOSITORY}/{service_name}:{tag}"
+        bucket = f"{self.project_id}_cloudbuild"
+        source_object = f"source/{service_name}-{tag}.tgz"
+        self._ensure_build_targets(bucket)
+        
+        ignore = SourceIgnore(source_path)
+        with tempfile.NamedTemporaryFile(suffix=".tgz") as archive:
+            with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+                for entry in os.scandir(source_path):
+                    tar.add(
+                        entry.path, arcname=entry.name,
+                        filter=lambda info: None if ignore.ignored(info.name, info.isdir()) else info
+                    )
+            archive.flush()
+            self.storage_client.bucket(bucket).blob(source_object).upload_from_filename(archive.name)
+        
+        if os.path.exists(os.path.join(source_path, "Dockerfile")):
+            steps = [cloudbuild_v1.BuildStep(name="gcr.io/cloud-builders/docker", args=["build", "-t", image, "."])]
+            images = [image]
+        else:
+            # Same buildpacks builder `gcloud run deploy --source` uses without a Dockerfile
+            steps = [cloudbuild_v1.BuildStep(
+                name="gcr.io/k8s-skaffold/pack",
+                entrypoint="pack",
+                args=["build", image, "--builder", "gcr.io/buildpacks/builder:latest", "--network", "cloudbuild", "--publish"]
+            )]
+            images = []
+        
+        build = cloudbuild_v1.Build(
+            source=cloudbuild_v1.Source(storage_source=cloudbuild_v1.StorageSource(bucket=bucket, object_=source_object)),
+            steps=steps,
+            images=images,
+            timeout={"seconds": DEPLOY_TIMEOUT}
+        )
+        self.logger.info(f"🚀 Building {image}")
+        operation = self.build_client.create_build(project_id=self.project_id, build=build)
+        
+        try:
+            build = operation.result(timeout=DEPLOY_TIMEOUT)
+        except Exception as e:
+            raise DeploymentError(self._read_build_log(operation.metadata.build.id) or str(e))
+        if build.status != cloudbuild_v1.Build.Status.SUCCESS:
+            raise DeploymentError(self._read_build_log(build.id) or f"Build {build.id} finished {build.status.name}")
+        return image
+
+    def _ensure_build_targets(self, bucket: str):
+        """Create the source bucket and image repository on first deploy, as gcloud does"""
+        if self.storage_client.lookup_bucket(bucket) is None:
+            try:
+                self.storage_client.create_bucket(bucket)
+            except gcp_exceptions.Conflict:
+                pass
+        
+        parent = f"projects/{self.project_id}/locations/{self.region}"
+        try:
+            self.artifact_client.get_repository(name=f"{parent}/repositories/{SOURCE_REPOSITORY}")
+        except gcp_exceptions.NotFound:
+            self.logger.info(f"📦 Creating Artifact Registry repository {SOURCE_REPOSITORY}")
+            try:
+                self.artifact_client.create_repository(
+                    parent=parent,
+                    repository_id=SOURCE_REPOSITORY,
+                    repository=artifactregistry_v1.Repository(
+                        format_=artifactregistry_v1.Repository.Format.DOCKER,
+                        description="Cloud Run Source Deployments"
+                    )
+                ).result(timeout=DEPLOY_TIMEOUT)
+            except gcp_exceptions.AlreadyExists:
+                pass
+
+    def _read_build_log(self, build_id: str) -> Optional[str]:
+        """Fetch the tail and error lines of a build's log from its logs bucket"""
+        try:
+            build = self.build_client.get_build(project_id=self.project_id, id=build_id)
+            bucket = build.logs_bucket.replace("gs://", "", 1)
+            log = LogRingBuffer()
+            with self.storage_client.bucket(bucket).blob(f"log-{build_id}.txt").open("rb") as f:
+                for line in f:
+                    log.append(line)
+            return log.render()
+        except Exception as e:
+            self.logger.warning(f"Could not read build log for {build_id}: {e}")
+            return None
+
+    def _deploy_image(self, service_name: str, image: str) -> run_v2.Service:
+        """Create or update the Cloud Run service to run the image"""
+        parent = f"projects/{self.project_id}/locations/{self.region}"
+        name = f"{parent}/services/{service_name}"
+        
+        try:
+            # Update the live service so settings made outside this pipeline (service account,
+            # VPC, secrets, min instances, ingress) survive, as they do with `gcloud run deploy`
+            service = self.run_client.get_service(name=name)
+        except gcp_exceptions.NotFound:
+            service = run_v2.Service(template=run_v2.RevisionTemplate(containers=[run_v2.Container()]))
+            self._configure_revision(service.template, image)
+            operation = self.run_client.create_service(parent=parent, service=service, service_id=service_name)
+        else:
+            self._configure_revision(service.template, image)
+            operation = self.run_client.update_service(service=service)
+        
+        self.logger.info(f"🚀 Rolling out {service_name}")
+        try:
+            deployed = operation.result(timeout=DEPLOY_TIMEOUT)
+        except gcp_exceptions.GoogleAPICallError as e:
+            raise DeploymentError(f"Cloud Run rollout failed: {e}")
+        
+        try:
+            self._allow_unauthenticated(name)
+        except gcp_exceptions.GoogleAPICallError as e:
+            # The rollout succeeded; like gcloud, only warn when e.g. an org policy forbids allUsers
+            self.logger.warning(f"Could not allow unauthenticated access to {service_name}: {e}")
+        return deployed
+
+    def _configure_revision(self, template: run_v2.RevisionTemplate, image: str):
+        """Apply the settings the gcloud fallback passes as flags, leaving everything else as it is"""
+        template.revision = ""  # Let Cloud Run name the new revision
+        template.timeout = datetime.timedelta(seconds=300)
+        template.scaling.max_instance_count = 10
+        
+        container = template.containers[0]
+        container.image = image
+        container.resources.limits["cpu"] = "1"
+        container.resources.limits["memory"] = "1Gi"
+        del container.ports[:]
+        container.ports.append(run_v2.ContainerPort(container_port=8080))
+        
+        node_env = next((var for var in container.env if var.name == "NODE_ENV"), None)
+        if node_env is None:
+            container.env.append(run_v2.EnvVar(name="NODE_ENV", value="production"))
+        else:
+            node_env.value = "production"
+
+    def _allow_unauthenticated(self, name: str):
+        """Grant allUsers the invoker role, like --allow-unauthenticated"""
+        policy = self.run_client.get_iam_policy(request={"resource": name})
+        if any(b.role == "roles/run.invoker" and "allUsers" in b.members for b in policy.bindings):
+            return
+        policy.bindings.add(role="roles/run.invoker", members=["allUsers"])
+        self.run_client.set_iam_policy(request={"resource": name, "policy": policy})
+
+    async def _execute_gcloud_deployment(self, service_name: str, source_path: str) -> Dict:
+        """Deploy through the gcloud CLI when the Cloud Build/Storage clients are not installed"""
         try:
             # Build and deploy using optimized configuration
             cmd = [
@@ -178,17 +709,34 @@ class AIAgentOrchestrator:
             
             self.logger.info(f"🚀 Executing: {' '.join(cmd)}")
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            # Run gcloud without blocking the event loop for the length of the build
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=2 ** 20
+            )
+            # Keep only a bounded window of the (possibly multi-MB) build output
+            stdout_log, stderr_log = LogRingBuffer(), LogRingBuffer()
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(stdout_log.drain(proc.stdout), stderr_log.drain(proc.stderr), proc.wait()),
+                    timeout=DEPLOY_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                return {"success": False, "logs": "Deployment timed out after 10 minutes"}
+            finally:
+                # Whether it timed out, a drain failed or the task was cancelled, don't orphan gcloud
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
             
-            if result.returncode == 0:
+            stdout = stdout_log.render()
+            stderr = stderr_log.render()
+            if proc.returncode == 0:
                 # Extract service URL from output
-                url = self._extract_service_url(result.stdout)
-                return {"success": True, "url": url, "logs": result.stdout}
+                url = self._extract_service_url(stdout)
+                return {"success": True, "url": url, "logs": stdout}
             else:
-                return {"success": False, "logs": result.stderr, "stdout": result.stdout}
+                return {"success": False, "logs": stderr, "stdout": stdout}
                 
-        except subprocess.TimeoutExpired:
-            return {"success": False, "logs": "Deployment timed out after 10 minutes"}
         except Exception as e:
             return {"success": False, "logs": f"Deployment error: {str(e)}"}
 
@@ -206,63 +754,154 @@ class AIAgentOrchestrator:
         4. Priority level (critical/high/medium/low)
         """
         
-        return await self._get_agent_response("diagnostic_agent", diagnostic_prompt)
+        return await self._get_agent_response(self.diagnostic_agent, diagnostic_prompt)
+
+    def _speculative_fix_prompt(self, logs: str) -> str:
+        """Generic fix prompt that can be issued before diagnostics complete"""
+        return f"""
+        This Cloud Run deployment failed. Call the fix actions for the most likely causes:
+        
+        {logs}
+        """
 
-    async def _attempt_auto_fix(self, service_name: str, diagnostics: Dict) -> Dict:
+    async def _attempt_auto_fix(self, service_name: str, source_path: str, diagnostics: Dict,
+                                speculative_calls: Optional[List[Tuple[str, Dict[str, Any]]]] = None) -> Dict:
         """Attempt to automatically fix identified issues"""
+        # The diagnosis agrees with the speculative draft, so apply it without another fix call
+        if self._diagnosis_backs(speculative_calls or [], diagnostics.get("response", "")):
+            try:
+                fixes_applied = await self._apply_fixes(self._replay_fix_calls(speculative_calls), source_path)
+                return {"fixed": True, "changes": fixes_applied}
+            except Exception as e:
+                return {"fixed": False, "error": str(e)}
+        
+        # Otherwise the diagnosis narrows the fix; refine using it
         fix_prompt = f"""
         Based on these diagnostics, generate specific fixes:
         
         {diagnostics}
         
-        Provide:
-        1. Code changes needed
-        2. Configuration updates
-        3. Commands to execute
-        4. Files to modify
+        Call the fix actions that address them.
         """
         
-        fix_response = await self._get_agent_response("fix_agent", fix_prompt)
-        
-        # Apply fixes automatically (simplified example)
+        # Apply fixes automatically while the response is still streaming
         try:
-            # Parse fix response and apply changes
-            fixes_applied = await self._apply_fixes(fix_response)
+            fixes_applied = await self._apply_fixes(self._stream_fix_calls(fix_prompt), source_path)
             return {"fixed": True, "changes": fixes_applied}
         except Exception as e:
             return {"fixed": False, "error": str(e)}
 
-    async def _apply_fixes(self, fix_response: Dict) -> List[str]:
-        """Apply the fixes suggested by the AI agent"""
+    async def _draft_speculative_fix(self, logs: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Collect the fix calls drafted from the raw logs without applying them; failures just mean no draft"""
+        try:
+            return [call async for call in self._stream_fix_calls(self._speculative_fix_prompt(logs))]
+        except Exception as e:
+            self.logger.warning(f"Speculative fix not applicable: {e}")
+            return []
+
+    @staticmethod
+    def _diagnosis_backs(calls: List[Tuple[str, Dict[str, Any]]], diagnosis: str) -> bool:
+        """Whether the draft changes files and the diagnosis points at every file it would change"""
+        file_actions = [name for name, _ in calls if name in FIX_ACTION_HINTS]
+        return bool(file_actions) and all(FIX_ACTION_HINTS[name].search(diagnosis) for name in file_actions)
+
+    @staticmethod
+    async def _replay_fix_calls(calls: List[Tuple[str, Dict[str, Any]]]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Feed already-collected fix calls to _apply_fixes"""
+        for call in calls:
+            yield call
+
+    async def _apply_fixes(self, fix_calls: AsyncIterator[Tuple[str, Dict[str, Any]]], source_path: str) -> List[str]:
+        """Dispatch the fix agent's function calls to handlers editing source_path as they stream in"""
+        pending = []
+        last_call: Dict[str, asyncio.Task] = {}
+        
+        try:
+            async for name, args in fix_calls:
+                handler = self.fix_handlers.get(name)
+                if handler is None:
+                    self.logger.warning(f"Fix agent called unknown action {name}")
+                    continue
+                # Write the fix while the rest of the response generates
+                task = asyncio.create_task(self._run_fix(handler, source_path, args, last_call.get(name)))
+                last_call[name] = task
+                pending.append(task)
+        except Exception as e:
+            if not pending:
+                raise
+            self.logger.warning(f"Fix stream interrupted, keeping fixes already applied: {e}")
+        
+        # One failed action must not hide the files the others already changed
         changes = []
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Fix action failed: {result}")
+            elif result:
+                changes.append(result)
+        return changes
+
+    async def _run_fix(self, handler, source_path: str, args: Dict[str, Any],
+                       previous: Optional[asyncio.Task]) -> Optional[str]:
+        """Run a fix once any earlier call to the same handler is done with the file it edits"""
+        if previous is not None:
+            await asyncio.wait([previous])
+        return await asyncio.to_thread(handler, source_path, **args)
+
+    def _fix_port(self, source_path: str, default_port: int = 8080) -> Optional[str]:
+        """Make server.js listen on the PORT env var Cloud Run provides"""
+        path = os.path.join(source_path, "server.js")
+        try:
+            with open(path) as f:
+                source = f.read()
+        except FileNotFoundError:
+            return None
         
-        # Example: Fix common PORT issue
-        if "PORT" in fix_response.get("response", ""):
-            # Update app code to listen on PORT env var
-            port_fix = """
-const port = process.env.PORT || 8080;
-app.listen(port, '0.0.0.0', () => {
-  console.log(`Server running on port ${port}`);
-});
-"""
-            # Write fix to appropriate file
-            changes.append("Updated port configuration")
-        
-        # Example: Fix package.json start script
-        if "start script" in fix_response.get("response", "").lower():
-            package_json_update = {
-                "scripts": {
-                    "start": "node server.js",
-                    "dev": "node server.js"
-                }
+        if "process.env.PORT" in source:
+            return None
+        
+        # Only rewrite a listen call that exists; appending one can't know the server's variable names
+        match = LISTEN_CALL_RE.search(source)
+        if match is None:
+            return None
+        port = match.group(2)
+        fallback = int(default_port) if port.isdigit() else port
+        source = f"{source[:match.start(2)]}process.env.PORT || {fallback}{source[match.end(2):]}"
+        
+        if not write_if_changed(path, source.encode()):
+            return None
+        return "Updated port configuration"
+
+    def _fix_start_script(self, source_path: str, start_command: str = "node server.js") -> Optional[str]:
+        """Give package.json a start script that runs the server"""
+        package_json_update = {
+            "scripts": {
+                "start": start_command,
+                "dev": start_command
             }
-            changes.append("Updated package.json start script")
+        }
+        path = os.path.join(source_path, "package.json")
+        try:
+            with open(path, "rb") as f:
+                package = orjson.loads(f.read())
+        except FileNotFoundError:
+            package = {}
         
-        return changes
+        scripts = package.setdefault("scripts", {})
+        if all(scripts.get(name) == command for name, command in package_json_update["scripts"].items()):
+            return None
+        
+        scripts.update(package_json_update["scripts"])
+        if not write_if_changed(path, orjson.dumps(package, option=orjson.OPT_INDENT_2)):
+            return None
+        return "Updated package.json start script"
 
-    async def _setup_monitoring(self, service_name: str):
-        """Setup comprehensive monitoring using AI agent recommendations"""
-        monitoring_prompt = f"""
+    def _report_manual_fix(self, source_path: str, summary: str) -> Optional[str]:
+        """Surface a fix that needs a human; nothing is changed on disk"""
+        self.logger.warning(f"🛠️ Manual fix suggested: {summary}")
+        return None
+
+    def _monitoring_prompt(self, service_name: str) -> str:
+        return f"""
         Setup comprehensive monitoring for Cloud Run service '{service_name}'.
         
         Include:
@@ -272,70 +911,287 @@ app.listen(port, '0.0.0.0', () => {
         4. Uptime monitoring
         5. Automated alerting rules
         """
+
+    async def _setup_monitoring(self, service_name: str, url: Optional[str] = None,
+                                monitoring_plan: Optional[Awaitable[Dict]] = None):
+        """Setup comprehensive monitoring using AI agent recommendations"""
+        if monitoring_plan is None:
+            monitoring_plan = self._get_agent_response(
+                self.monitoring_agent, self._monitoring_prompt(service_name), semantic_scope=service_name
+            )
         
-        monitoring_plan = await self._get_agent_response("monitoring_agent", monitoring_prompt)
-        
-        # Implement monitoring setup
-        await self._create_monitoring_dashboard(service_name)
-        await self._setup_alerts(service_name)
+        # Implement monitoring setup alongside the agent's recommendations
+        monitoring_plan, _, _ = await asyncio.gather(
+            monitoring_plan,
+            self._create_monitoring_dashboard(service_name),
+            self._setup_alerts(service_name, url)
+        )
 
     async def _create_monitoring_dashboard(self, service_name: str):
         """Create monitoring dashboard"""
         # Simplified dashboard creation
         self.logger.info(f"📊 Created monitoring dashboard for {service_name}")
 
-    async def _setup_alerts(self, service_name: str):
-        """Setup intelligent alerting"""
-        # Simplified alert setup
+    async def _setup_alerts(self, service_name: str, url: Optional[str] = None):
+        """Setup intelligent alerting, delivered to Pub/Sub so monitoring wakes on incidents"""
+        try:
+            await self._create_alerts(service_name, url)
+        except (gcp_exceptions.GoogleAPICallError, HttpError) as e:
+            # The rollout already succeeded; without alerts continuous_monitoring just polls
+            self.alert_delivery.discard(service_name)
+            self.logger.warning(f"Alerting setup for {service_name} failed, monitoring will poll instead: {e}")
+            return
         self.logger.info(f"🚨 Setup alerts for {service_name}")
 
-    async def _retry_deployment(self, service_name: str, source_path: str) -> Dict:
-        """Retry deployment after fixes"""
-        self.logger.info("🔄 Retrying deployment with applied fixes...")
-        return await self.orchestrate_deployment(service_name, source_path)
+    async def _create_alerts(self, service_name: str, url: Optional[str]):
+        """Create or update the alert channel, uptime check and alert policies for the service"""
+        channel = await asyncio.to_thread(self._setup_alert_channel, service_name)
+        parent = f"projects/{self.project_id}"
+        run_filter = f'resource.type="cloud_run_revision" AND resource.label.service_name="{service_name}"'
+        
+        policies = [
+            self._threshold_policy(
+                f"{service_name} 5xx error rate", "5xx responses above 1/s",
+                f'metric.type="run.googleapis.com/request_count" AND {run_filter} '
+                'AND metric.label.response_code_class="5xx"',
+                "ALIGN_RATE", "COMPARISON_GT", 1.0, channel
+            ),
+            self._threshold_policy(
+                f"{service_name} p99 latency", "p99 latency above 5s",
+                f'metric.type="run.googleapis.com/request_latencies" AND {run_filter}',
+                "ALIGN_PERCENTILE_99", "COMPARISON_GT", 5000.0, channel
+            ),
+        ]
+        uptime_checks = []
+        if url and url.startswith("https://"):
+            host = urlparse(url).hostname
+            uptime_checks.append({
+                "displayName": f"{service_name} health",
+                "monitoredResource": {"type": "uptime_url", "labels": {"project_id": self.project_id, "host": host}},
+                "httpCheck": {"path": "/health", "port": 443, "useSsl": True},
+                "period": "60s",
+                "timeout": "10s"
+            })
+            policies.append(self._threshold_policy(
+                f"{service_name} uptime check failed", "Health check failing",
+                f'metric.type="monitoring.googleapis.com/uptime_check/check_passed" '
+                f'AND resource.type="uptime_url" AND resource.label.host="{host}"',
+                "ALIGN_FRACTION_TRUE", "COMPARISON_LT", 1.0, channel
+            ))
+        
+        projects = self.monitoring_api.projects()
+        existing_checks, existing_policies = await asyncio.to_thread(self._existing_alerting, parent)
+        
+        # One multipart batch instead of a round trip per write; redeploys patch what an
+        # earlier deploy created instead of duplicating it (uptime checks are quota-limited)
+        requests = []
+        for check in uptime_checks:
+            if check["displayName"] in existing_checks:
+                requests.append(projects.uptimeCheckConfigs().patch(
+                    name=existing_checks[check["displayName"]], body=check, updateMask="httpCheck,period,timeout"
+                ))
+            else:
+                requests.append(projects.uptimeCheckConfigs().create(parent=parent, body=check))
+        for policy in policies:
+            if policy["displayName"] in existing_policies:
+                requests.append(projects.alertPolicies().patch(name=existing_policies[policy["displayName"]], body=policy))
+            else:
+                requests.append(projects.alertPolicies().create(name=parent, body=policy))
+        await asyncio.to_thread(self._batch_gcp, requests)
+
+    def _threshold_policy(self, display_name: str, condition_name: str, metric_filter: str,
+                          aligner: str, comparison: str, threshold: float, channel: str) -> Dict:
+        """REST body for a single-condition metric threshold alert policy"""
+        return {
+            "displayName": display_name,
+            "combiner": "OR",
+            "conditions": [{
+                "displayName": condition_name,
+                "conditionThreshold": {
+                    "filter": metric_filter,
+                    "aggregations": [{"alignmentPeriod": "60s", "perSeriesAligner": aligner}],
+                    "comparison": comparison,
+                    "thresholdValue": threshold,
+                    "duration": "60s"
+                }
+            }],
+            "notificationChannels": [channel]
+        }
+
+    def _existing_alerting(self, parent: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Existing uptime checks and alert policies by displayName, listed one after the other
+        because the discovery client's shared httplib2 connection isn't thread-safe"""
+        projects = self.monitoring_api.projects()
+        return (
+            self._existing_by_display_name(projects.uptimeCheckConfigs(), "uptimeCheckConfigs", parent=parent),
+            self._existing_by_display_name(projects.alertPolicies(), "alertPolicies", name=parent),
+        )
+
+    @staticmethod
+    def _existing_by_display_name(collection, items_key: str, **kwargs) -> Dict[str, str]:
+        """Map displayName to resource name across every page of a Monitoring API list"""
+        found = {}
+        request = collection.list(**kwargs)
+        while request is not None:
+            response = request.execute()
+            for item in response.get(items_key, []):
+                found[item["displayName"]] = item["name"]
+            request = collection.list_next(request, response)
+        return found
+
+    def _batch_gcp(self, requests: List[HttpRequest]) -> List[Optional[Dict]]:
+        """Execute Monitoring API requests as multipart batches; failed subrequests yield None"""
+        results: List[Optional[Dict]] = [None] * len(requests)
+        
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                self.logger.warning(f"Batched request {request_id} failed: {exception}")
+            else:
+                results[int(request_id)] = response
+        
+        for offset in range(0, len(requests), BATCH_MAX_SUBREQUESTS):
+            batch = self.monitoring_api.new_batch_http_request(callback=on_response)
+            for index, request in enumerate(requests[offset:offset + BATCH_MAX_SUBREQUESTS], start=offset):
+                batch.add(request, request_id=str(index))
+            batch.execute()
+        
+        return results
+
+    def _alert_topic(self, service_name: str) -> str:
+        return self.publisher.topic_path(self.project_id, f"{service_name}-alerts")
+
+    def _alert_subscription(self, service_name: str) -> str:
+        return self.subscriber.subscription_path(self.project_id, f"{service_name}-alerts")
+
+    def _setup_alert_channel(self, service_name: str) -> str:
+        """Create the alert topic, its subscription and a Pub/Sub notification channel"""
+        topic = self._alert_topic(service_name)
+        subscription = self._alert_subscription(service_name)
+        try:
+            self.publisher.create_topic(name=topic)
+        except gcp_exceptions.AlreadyExists:
+            pass
+        try:
+            self.subscriber.create_subscription(name=subscription, topic=topic)
+        except gcp_exceptions.AlreadyExists:
+            pass
+        
+        # Reuse the channel from an earlier deploy rather than piling up duplicates
+        parent = f"projects/{self.project_id}"
+        channel = next(
+            (c for c in self.notification_client.list_notification_channels(name=parent, filter='type="pubsub"')
+             if c.labels.get("topic") == topic),
+            None
+        )
+        if channel is None:
+            channel = self.notification_client.create_notification_channel(
+                name=parent,
+                notification_channel=monitoring_v3.NotificationChannel(
+                    type_="pubsub",
+                    display_name=f"{service_name} alerts",
+                    labels={"topic": topic}
+                )
+            )
+        
+        # Creating the first Pub/Sub channel provisions the service agent that publishes to the topic
+        try:
+            self._allow_alert_publishing(topic)
+            self.alert_delivery.add(service_name)
+        except (gcp_exceptions.GoogleAPICallError, HttpError) as e:
+            self.logger.warning(f"Alerts for {service_name} can't reach {topic}, polling instead: {e}")
+        return channel.name
+
+    def _allow_alert_publishing(self, topic: str):
+        """Grant the Cloud Monitoring notification service agent the publisher role on the topic"""
+        project = self.resource_manager_api.projects().get(name=f"projects/{self.project_id}").execute()
+        member = "serviceAccount:" + MONITORING_NOTIFICATION_AGENT.format(
+            project_number=project["name"].split("/")[-1]
+        )
+        policy = self.publisher.get_iam_policy(request={"resource": topic})
+        if any(b.role == "roles/pubsub.publisher" and member in b.members for b in policy.bindings):
+            return
+        policy.bindings.add(role="roles/pubsub.publisher", members=[member])
+        self.publisher.set_iam_policy(request={"resource": topic, "policy": policy})
 
     def _extract_service_url(self, output: str) -> str:
-        """Extract service URL from gcloud output"""
-        import re
-        url_pattern = r'https://[\w\-\.]+\.run\.app'
-        match = re.search(url_pattern, output)
+        """Extract service URL from gcloud output (CLI fallback only; the API path reads service.uri)"""
+        match = SERVICE_URL_RE.search(output)
         return match.group() if match else "URL not found"
 
-    async def continuous_monitoring(self, service_name: str):
-        """Continuous monitoring loop with AI-powered responses"""
-        while True:
-            try:
-                # Check service health
-                health_status = await self._check_service_health(service_name)
-                
-                if not health_status.get("healthy"):
-                    self.logger.warning(f"⚠️ Service {service_name} unhealthy, triggering auto-recovery")
+    async def continuous_monitoring(self, service_name: str, url: Optional[str] = None):
+        """Continuous monitoring loop with AI-powered responses, woken by alert notifications"""
+        if not (url and url.startswith("https://")):
+            url = await asyncio.to_thread(self._service_url, service_name)
+        alerts: asyncio.Queue = asyncio.Queue()
+        streaming_pull = self._subscribe_alerts(service_name, alerts)
+        # Without a working alert topic this is a plain poll, so keep the original interval
+        staleness = MONITORING_MAX_STALENESS if service_name in self.alert_delivery else HEALTH_CHECK_INTERVAL
+        
+        try:
+            while True:
+                try:
+                    # Block until an alert arrives; fall back to a direct check to bound staleness
+                    try:
+                        alert = await asyncio.wait_for(alerts.get(), timeout=staleness)
+                        health_status = self._parse_alert(alert)
+                    except asyncio.TimeoutError:
+                        health_status = await self._check_service_health(url)
                     
-                    # Get AI recommendation for recovery
-                    recovery_plan = await self._get_agent_response(
-                        "monitoring_agent",
-                        f"Service {service_name} is unhealthy: {health_status}. Provide recovery actions."
-                    )
+                    if not health_status.get("healthy"):
+                        self.logger.warning(f"⚠️ Service {service_name} unhealthy, triggering auto-recovery")
+                        
+                        # Get AI recommendation for recovery
+                        recovery_plan = await self._get_agent_response(
+                            self.monitoring_agent,
+                            f"Service {service_name} is unhealthy: {health_status}. Provide recovery actions."
+                        )
+                        
+                        # Execute recovery
+                        await self._execute_recovery(service_name, recovery_plan)
                     
-                    # Execute recovery
-                    await self._execute_recovery(service_name, recovery_plan)
-                
-                # Wait before next check
-                await asyncio.sleep(60)  # Check every minute
-                
-            except Exception as e:
-                self.logger.error(f"Monitoring error: {e}")
-                await asyncio.sleep(300)  # Wait 5 minutes on error
+                except Exception as e:
+                    self.logger.error(f"Monitoring error: {e}")
+                    await asyncio.sleep(300)  # Wait 5 minutes on error
+        finally:
+            streaming_pull.cancel()
+
+    def _subscribe_alerts(self, service_name: str, alerts: asyncio.Queue):
+        """Start a streaming pull on the alert subscription, forwarding messages to the event loop"""
+        loop = asyncio.get_running_loop()
+        
+        def on_message(message):
+            message.ack()
+            loop.call_soon_threadsafe(alerts.put_nowait, message.data)
+        
+        return self.subscriber.subscribe(self._alert_subscription(service_name), callback=on_message)
 
-    async def _check_service_health(self, service_name: str) -> Dict:
+    def _parse_alert(self, data: bytes) -> Dict:
+        """Translate a Cloud Monitoring Pub/Sub notification into a health status"""
+        try:
+            incident = orjson.loads(data).get("incident", {})
+        except ValueError:
+            return {"healthy": False, "error": "Unparseable alert notification"}
+        
+        # Closed incidents mean the condition has recovered
+        return {
+            "healthy": incident.get("state") != "open",
+            "policy": incident.get("policy_name"),
+            "condition": incident.get("condition_name"),
+            "summary": incident.get("summary")
+        }
+
+    def _service_url(self, service_name: str) -> str:
+        """Deployed URL of the Cloud Run service"""
+        return self.run_client.get_service(
+            name=f"projects/{self.project_id}/locations/{self.region}/services/{service_name}"
+        ).uri
+
+    async def _check_service_health(self, url: str) -> Dict:
         """Check service health status"""
         try:
-            # Simplified health check
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                url = f"https://{service_name}-[hash]-uc.a.run.app/health"
-                async with session.get(url, timeout=10) as response:
-                    return {"healthy": response.status == 200}
+            session = await self._get_http_session()
+            async with session.get(f"{url}/health", timeout=aiohttp.ClientTimeout(total=10)) as response:
+                return {"healthy": response.status == 200}
         except:
             return {"healthy": False, "error": "Health check failed"}
 
@@ -353,17 +1209,20 @@ async def main():
         region="us-central1"
     )
     
-    # Deploy with AI orchestration
-    result = await orchestrator.orchestrate_deployment(
-        service_name="byword-intake-api",
-        source_path="."
-    )
-    
-    print(f"🤖 AI Orchestration Result: {json.dumps(result, indent=2)}")
-    
-    if result.get("status") == "success":
-        # Start continuous monitoring
-        await orchestrator.continuous_monitoring("byword-intake-api")
+    try:
+        # Deploy with AI orchestration
+        result = await orchestrator.orchestrate_deployment(
+            service_name="byword-intake-api",
+            source_path="."
+        )
+        
+        print(f"🤖 AI Orchestration Result: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
+        
+        if result.get("status") == "success":
+            # Start continuous monitoring
+            await orchestrator.continuous_monitoring("byword-intake-api", result.get("url"))
+    finally:
+        await orchestrator.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
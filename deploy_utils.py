@@ -0,0 +1,139 @@
+"""
+Pure helpers for the deployment pipeline: source filtering, digests, log capture and failure signatures
+"""
+
+import asyncio
+import fnmatch
+import hashlib
+import os
+import re
+from collections import deque
+from typing import List, Optional, Tuple
+
+SOURCE_ARCHIVE_EXCLUDES = {".git", "node_modules", "__pycache__", ".deploy-cache"}
+SOURCE_IGNORE_FILE = ".gcloudignore"
+# What gcloud writes as .gcloudignore when a source tree doesn't have one
+DEFAULT_SOURCE_IGNORE = [".gcloudignore", ".git", ".gitignore", "#!include:.gitignore"]
+LOG_TAIL_LINES = 500
+LOG_ERROR_LINES = 200
+LOG_ERROR_RE = re.compile(rb"error|exception|failed|traceback", re.I)
+# Build ids, timestamps, hashes and counts that differ between otherwise identical failures
+VOLATILE_TOKEN_RE = re.compile(r"[0-9a-f]{8,}(?:-[0-9a-f]{4,})*|\d+", re.I)
+
+
+class LogRingBuffer:
+    """Bounded view of a long log: its last lines plus the first error-looking lines before them"""
+
+    def __init__(self, tail_lines: int = LOG_TAIL_LINES, error_lines: int = LOG_ERROR_LINES):
+        self.tail = deque(maxlen=tail_lines)
+        self.errors: List[Tuple[int, str]] = []
+        self.error_lines = error_lines
+        self.line_count = 0
+
+    def append(self, line: bytes):
+        self.line_count += 1
+        if len(self.tail) == self.tail.maxlen:
+            # Error lines move to self.errors only once evicted, so errors still in the tail can't crowd
+            # them out; once it is full later ones are dropped, keeping the earliest (root-cause) errors
+            number, text, is_error = self.tail[0]
+            if is_error and len(self.errors) < self.error_lines:
+                self.errors.append((number, text))
+        text = line.decode(errors="replace").rstrip("\r\n")
+        self.tail.append((self.line_count, text, bool(LOG_ERROR_RE.search(line))))
+
+    async def drain(self, stream: asyncio.StreamReader):
+        async for line in stream:
+            self.append(line)
+
+    def render(self) -> str:
+        """Error lines that scrolled out of the tail, then the tail itself"""
+        first_tail = self.tail[0][0] if self.tail else self.line_count + 1
+        lines = [text for _, text in self.errors]
+        omitted = first_tail - 1 - len(lines)
+        if omitted:
+            lines.append(f"... {omitted} lines omitted ...")
+        lines += [text for _, text, _ in self.tail]
+        return "\n".join(lines)
+
+
+class SourceIgnore:
+    """gitignore-style upload rules from .gcloudignore, applied the way gcloud applies them"""
+
+    def __init__(self, source_path: str):
+        self.source_path = source_path
+        self.rules: List[Tuple[bool, bool, bool, str]] = []  # (negated, dir_only, anchored, pattern)
+        path = os.path.join(source_path, SOURCE_IGNORE_FILE)
+        if os.path.exists(path):
+            self._load(path)
+        else:
+            self._add_lines(DEFAULT_SOURCE_IGNORE)
+
+    def _load(self, path: str):
+        try:
+            with open(path) as f:
+                self._add_lines(f.read().splitlines())
+        except FileNotFoundError:
+            pass
+
+    def _add_lines(self, lines: List[str]):
+        for line in lines:
+            line = line.rstrip()
+            if line.startswith("#!include:"):
+                self._load(os.path.join(self.source_path, line[len("#!include:"):].strip()))
+                continue
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            line = line.lstrip("!")
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            self.rules.append((negated, dir_only, "/" in line, line.lstrip("/")))
+
+    def ignored(self, relpath: str, is_dir: bool) -> bool:
+        """Whether a path (relative to the source root, '/'-separated) is left out of the upload"""
+        name = relpath.rsplit("/", 1)[-1]
+        if name in SOURCE_ARCHIVE_EXCLUDES:
+            return True
+        ignored = False
+        for negated, dir_only, anchored, pattern in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if fnmatch.fnmatchcase(relpath if anchored else name, pattern):
+                ignored = not negated
+        return ignored
+
+
+def source_digest(path: str, ignore: Optional[SourceIgnore] = None, relpath: str = "") -> str:
+    """Merkle-style SHA-256 of the source tree, skipping exactly what the upload's tar filter skips"""
+    if ignore is None:
+        ignore = SourceIgnore(path)
+    entries = []
+    with os.scandir(path) as it:
+        for entry in sorted(it, key=lambda e: e.name):
+            entry_relpath = f"{relpath}/{entry.name}" if relpath else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if ignore.ignored(entry_relpath, is_dir):
+                continue
+            if is_dir:
+                entries.append(f"d {entry.name} {source_digest(entry.path, ignore, entry_relpath)}")
+            elif entry.is_file():
+                entries.append(f"f {entry.name} {file_digest(entry.path)}")
+    return hashlib.sha256("\n".join(entries).encode()).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+def error_signature(logs: str) -> str:
+    """Stable key for a failure: its error lines with ids, numbers and timestamps masked"""
+    lines = logs.splitlines()
+    error_lines = [line for line in lines if LOG_ERROR_RE.search(line.encode())] or lines
+    normalized = sorted({VOLATILE_TOKEN_RE.sub("#", line.strip()) for line in error_lines})
+    return hashlib.sha256("\n".join(normalized).encode()).hexdigest()
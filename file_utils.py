@@ -0,0 +1,30 @@
+"""
+File and entrypoint helpers shared by the deployment scripts and agents
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Any, Coroutine
+
+try:
+    import uvloop
+except ImportError:  # uvloop does not support Windows
+    uvloop = None
+
+
+def write_if_changed(path, data: bytes) -> bool:
+    """Write data to path unless it already holds these bytes; returns True if written"""
+    # Untouched files keep their mtime, so build layer caches stay warm across retries
+    path = Path(path)
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.write_bytes(data)
+    return True
+
+
+def run(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Run an entrypoint coroutine on uvloop's libuv-based loop where available, the default asyncio loop otherwise"""
+    return (uvloop.run if uvloop else asyncio.run)(coro)
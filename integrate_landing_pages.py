@@ -3,84 +3,29 @@
 AI Agent for Landing Page + API Integration
 """
 
-import subprocess
-import requests
-import json
-import time
+import asyncio
+import aiohttp
+import orjson
+from file_utils import run, write_if_changed
 
 API_URL = "https://byword-intake-api-vlqwfouhba-uc.a.run.app"
+DEPLOY_TIMEOUT = 600
 
-def deploy_enhanced_api():
-    """Deploy the enhanced API with landing page support"""
-    print("🚀 AI Agent: Deploying enhanced API with landing page integration...")
-    
-    cmd = [
-        "gcloud", "run", "deploy", "byword-intake-api",
-        "--source", ".",
-        "--region", "us-central1",
-        "--platform", "managed", 
-        "--allow-unauthenticated",
-        "--port", "8080",
-        "--memory", "1Gi",
-        "--cpu", "1",
-        "--timeout", "300",
-        "--max-instances", "10",
-        "--set-env-vars", "NODE_ENV=production,CORS_ENABLED=true"
-    ]
-    
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode == 0:
-        print("✅ Enhanced API deployed successfully!")
-        return True
-    else:
-        print("❌ Deployment failed:", result.stderr)
-        return False
+DEPLOY_CMD = (
+    "gcloud", "run", "deploy", "byword-intake-api",
+    "--source", ".",
+    "--region", "us-central1",
+    "--platform", "managed", 
+    "--allow-unauthenticated",
+    "--port", "8080",
+    "--memory", "1Gi",
+    "--cpu", "1",
+    "--timeout", "300",
+    "--max-instances", "10",
+    "--set-env-vars", "NODE_ENV=production,CORS_ENABLED=true"
+)
 
-def test_api_endpoints():
-    """Test all API endpoints for landing page integration"""
-    print("🧪 Testing API endpoints for landing page integration...")
-    
-    endpoints_to_test = [
-        {"url": f"{API_URL}/health", "method": "GET"},
-        {"url": f"{API_URL}/api/status", "method": "GET"},
-        {"url": f"{API_URL}/api/contact", "method": "POST", "data": {
-            "name": "Test User",
-            "email": "test@example.com", 
-            "company": "Test Company",
-            "service_type": "legal",
-            "message": "Test inquiry"
-        }}
-    ]
-    
-    results = []
-    for endpoint in endpoints_to_test:
-        try:
-            if endpoint["method"] == "GET":
-                response = requests.get(endpoint["url"], timeout=10)
-            else:
-                response = requests.post(endpoint["url"], 
-                                       json=endpoint.get("data", {}), 
-                                       timeout=10)
-            
-            if response.status_code in [200, 201]:
-                print(f"✅ {endpoint['url']} - Working")
-                results.append({"endpoint": endpoint["url"], "status": "working", "response": response.json()})
-            else:
-                print(f"⚠️ {endpoint['url']} - Status: {response.status_code}")
-                results.append({"endpoint": endpoint["url"], "status": "issue", "code": response.status_code})
-                
-        except Exception as e:
-            print(f"❌ {endpoint['url']} - Error: {e}")
-            results.append({"endpoint": endpoint["url"], "status": "error", "error": str(e)})
-    
-    return results
-
-def create_landing_page_connector():
-    """Create JavaScript connector for landing pages"""
-    print("📝 Creating landing page connector script...")
-    
-    js_connector = '''
+JS_CONNECTOR_BYTES = '''
 /**
  * Byword API Connector for Landing Pages
  * Connects landing page forms to the working API
@@ -239,22 +184,94 @@ document.addEventListener('DOMContentLoaded', function() {
     
     console.log('🚀 Byword API Connector initialized and ready!');
 });
-'''
+'''.encode()
+
+async def deploy_enhanced_api():
+    """Deploy the enhanced API with landing page support"""
+    print("🚀 AI Agent: Deploying enhanced API with landing page integration...")
+    
+    proc = await asyncio.create_subprocess_exec(
+        *DEPLOY_CMD, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=DEPLOY_TIMEOUT)
+    except asyncio.TimeoutError:
+        print("❌ Deployment timed out after 10 minutes")
+        return False
+    finally:
+        # Don't leave gcloud running after a timeout or cancellation
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    
+    if proc.returncode == 0:
+        print("✅ Enhanced API deployed successfully!")
+        return True
+    else:
+        print("❌ Deployment failed:", stderr.decode(errors="replace"))
+        return False
+
+async def test_api_endpoints():
+    """Test all API endpoints for landing page integration"""
+    print("🧪 Testing API endpoints for landing page integration...")
+    
+    endpoints_to_test = [
+        {"url": f"{API_URL}/health", "method": "GET"},
+        {"url": f"{API_URL}/api/status", "method": "GET"},
+        {"url": f"{API_URL}/api/contact", "method": "POST", "data": {
+            "name": "Test User",
+            "email": "test@example.com", 
+            "company": "Test Company",
+            "service_type": "legal",
+            "message": "Test inquiry"
+        }}
+    ]
+    
+    async def probe(session, endpoint):
+        try:
+            if endpoint["method"] == "GET":
+                request = session.get(endpoint["url"])
+            else:
+                request = session.post(endpoint["url"], json=endpoint.get("data", {}))
+            
+            async with request as response:
+                if response.status in [200, 201]:
+                    print(f"✅ {endpoint['url']} - Working")
+                    return {"endpoint": endpoint["url"], "status": "working", "response": await response.json(loads=orjson.loads)}
+                else:
+                    print(f"⚠️ {endpoint['url']} - Status: {response.status}")
+                    return {"endpoint": endpoint["url"], "status": "issue", "code": response.status}
+                
+        except Exception as e:
+            print(f"❌ {endpoint['url']} - Error: {e}")
+            return {"endpoint": endpoint["url"], "status": "error", "error": str(e)}
+    
+    # All probes share one connection pool and run concurrently
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=10),
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    ) as session:
+        results = await asyncio.gather(*(probe(session, endpoint) for endpoint in endpoints_to_test))
+    
+    return list(results)
+
+def create_landing_page_connector():
+    """Create JavaScript connector for landing pages"""
+    print("📝 Creating landing page connector script...")
     
-    with open('byword-api-connector.js', 'w') as f:
-        f.write(js_connector)
+    write_if_changed('byword-api-connector.js', JS_CONNECTOR_BYTES)
     
     print("✅ Landing page connector created: byword-api-connector.js")
 
-def main():
+async def main():
     print("🤖 AI Agent: Integrating landing pages with working API...")
     
     # Deploy enhanced API
-    if deploy_enhanced_api():
-        time.sleep(10)  # Wait for deployment
+    if await deploy_enhanced_api():
+        await asyncio.sleep(10)  # Wait for deployment
         
         # Test endpoints
-        results = test_api_endpoints()
+        results = await test_api_endpoints()
         
         # Create connector
         create_landing_page_connector()
@@ -284,4 +301,4 @@ def main():
         print("❌ Integration failed - API deployment unsuccessful")
 
 if __name__ == "__main__":
-    main()
+    run(main())
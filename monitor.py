@@ -1,18 +1,32 @@
-import requests
-import time
+import asyncio
+import aiohttp
+from google.cloud import run_v2
+from file_utils import run
 
-def monitor_service():
-    url = "$(gcloud run services describe byword-intake-api --region=us-central1 --format='value(status.url)')"
-    while True:
-        try:
-            response = requests.get(f"{url}/health", timeout=10)
-            if response.status_code == 200:
-                print("✅ Service healthy")
-            else:
-                print(f"⚠️ Service issue: {response.status_code}")
-        except Exception as e:
-            print(f"❌ Service down: {e}")
-        time.sleep(60)  # Check every minute
+PROJECT_ID = "durable-trainer-466014-h8"
+REGION = "us-central1"
+SERVICE_NAME = "byword-intake-api"
+
+def resolve_service_url():
+    client = run_v2.ServicesClient()
+    service = client.get_service(name=f"projects/{PROJECT_ID}/locations/{REGION}/services/{SERVICE_NAME}")
+    return service.uri
+
+async def monitor_service():
+    url = resolve_service_url()
+    # One keep-alive connection reused for every check
+    connector = aiohttp.TCPConnector(limit=1, keepalive_timeout=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=10)) as session:
+        while True:
+            try:
+                async with session.get(f"{url}/health") as response:
+                    if response.status == 200:
+                        print("✅ Service healthy")
+                    else:
+                        print(f"⚠️ Service issue: {response.status}")
+            except Exception as e:
+                print(f"❌ Service down: {e}")
+            await asyncio.sleep(60)  # Check every minute
 
 if __name__ == "__main__":
-    monitor_service()
+    run(monitor_service())
@@ -1,11 +1,9 @@
 #!/usr/bin/env python3
 import subprocess
-import json
+import orjson
+from file_utils import write_if_changed
 
-print("🤖 Fixing byword-intake-api...")
-
-# Create server.js
-server_code = '''const express = require('express');
+SERVER_JS_BYTES = b'''const express = require('express');
 const app = express();
 const port = process.env.PORT || 8080;
 
@@ -21,30 +19,33 @@ app.listen(port, '0.0.0.0', () => {
     console.log('Server running on port', port);
 });'''
 
-with open('server.js', 'w') as f:
-    f.write(server_code)
-
-# Create package.json
-package = {
+PACKAGE_JSON_BYTES = orjson.dumps({
     "name": "byword-intake-api",
     "version": "1.0.0",
     "main": "server.js",
     "scripts": {"start": "node server.js"},
     "dependencies": {"express": "^4.18.2"}
-}
+}, option=orjson.OPT_INDENT_2)
 
-with open('package.json', 'w') as f:
-    json.dump(package, f, indent=2)
-
-print("✅ Files created. Deploying...")
-
-# Deploy
-result = subprocess.run([
+DEPLOY_CMD = (
     "gcloud", "run", "deploy", "byword-intake-api",
     "--source", ".", "--region", "us-central1",
     "--platform", "managed", "--allow-unauthenticated",
     "--port", "8080", "--memory", "1Gi"
-], capture_output=True, text=True)
+)
+
+print("🤖 Fixing byword-intake-api...")
+
+# Create server.js
+write_if_changed('server.js', SERVER_JS_BYTES)
+
+# Create package.json
+write_if_changed('package.json', PACKAGE_JSON_BYTES)
+
+print("✅ Files created. Deploying...")
+
+# Deploy
+result = subprocess.run(DEPLOY_CMD, capture_output=True, text=True)
 
 if result.returncode == 0:
     print("✅ SUCCESS!")
@@ -0,0 +1,175 @@
+import asyncio
+
+from deploy_utils import LogRingBuffer, SourceIgnore, error_signature, source_digest
+
+
+def write(root, relpath, text="x"):
+    path = root / relpath
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_default_rules_honour_gitignore(tmp_path):
+    write(tmp_path, ".gitignore", "*.log\n")
+    ignore = SourceIgnore(str(tmp_path))
+
+    assert ignore.ignored("app.log", False)
+    assert ignore.ignored("logs/app.log", False)
+    assert ignore.ignored(".gitignore", False)
+    assert not ignore.ignored("server.js", False)
+
+
+def test_gcloudignore_replaces_default_rules(tmp_path):
+    write(tmp_path, ".gitignore", "*.log\n")
+    write(tmp_path, ".gcloudignore", "venv/\n")
+    ignore = SourceIgnore(str(tmp_path))
+
+    assert not ignore.ignored("app.log", False)
+    assert ignore.ignored("venv", True)
+
+
+def test_include_directive_pulls_in_another_file(tmp_path):
+    write(tmp_path, ".gitignore", ".env\n")
+    write(tmp_path, ".gcloudignore", "#!include:.gitignore\n# comment\n\n")
+    ignore = SourceIgnore(str(tmp_path))
+
+    assert ignore.ignored(".env", False)
+    assert not ignore.ignored("# comment", False)
+
+
+def test_anchored_patterns_match_the_full_relative_path(tmp_path):
+    write(tmp_path, ".gcloudignore", "/build\nsrc/*.tmp\n")
+    ignore = SourceIgnore(str(tmp_path))
+
+    assert ignore.ignored("build", True)
+    assert not ignore.ignored("lib/build", True)
+    assert ignore.ignored("src/a.tmp", False)
+    assert not ignore.ignored("lib/src/a.tmp", False)
+
+
+def test_negation_reincludes_and_last_rule_wins(tmp_path):
+    write(tmp_path, ".gcloudignore", "*.log\n!keep.log\n")
+    ignore = SourceIgnore(str(tmp_path))
+
+    assert ignore.ignored("debug.log", False)
+    assert not ignore.ignored("keep.log", False)
+
+
+def test_dir_only_patterns_skip_files(tmp_path):
+    write(tmp_path, ".gcloudignore", "cache/\n")
+    ignore = SourceIgnore(str(tmp_path))
+
+    assert ignore.ignored("cache", True)
+    assert not ignore.ignored("cache", False)
+
+
+def test_archive_excludes_apply_at_every_depth(tmp_path):
+    ignore = SourceIgnore(str(tmp_path))
+
+    assert ignore.ignored("node_modules", True)
+    assert ignore.ignored("packages/api/node_modules", True)
+    assert ignore.ignored("src/__pycache__", True)
+
+
+def test_digest_ignores_changes_outside_the_upload(tmp_path):
+    write(tmp_path, ".gitignore", "*.log\n")
+    write(tmp_path, "server.js", "app.listen(8080)")
+    write(tmp_path, "packages/api/node_modules/dep.js")
+    before = source_digest(str(tmp_path))
+
+    write(tmp_path, "packages/api/node_modules/dep.js", "changed")
+    write(tmp_path, "debug.log", "changed")
+
+    assert source_digest(str(tmp_path)) == before
+
+
+def test_digest_tracks_uploaded_files_at_any_depth(tmp_path):
+    write(tmp_path, "src/routes/index.js", "a")
+    before = source_digest(str(tmp_path))
+
+    write(tmp_path, "src/routes/index.js", "b")
+    assert source_digest(str(tmp_path)) != before
+
+
+def test_digest_tracks_renames(tmp_path):
+    write(tmp_path, "a.js", "same")
+    before = source_digest(str(tmp_path))
+
+    (tmp_path / "a.js").rename(tmp_path / "b.js")
+    assert source_digest(str(tmp_path)) != before
+
+
+def test_error_signature_masks_ids_timestamps_and_counts():
+    first = "Step 3/5 ok\n2024-01-01T10:00:01Z ERROR: build 3f2a9c1d-1234-5678 failed after 42s"
+    second = "Step 4/5 ok\n2024-01-02T11:22:33Z ERROR: build 9ab01cd2-ffff-0000 failed after 17s"
+
+    assert error_signature(first) == error_signature(second)
+
+
+def test_error_signature_only_keys_on_error_lines():
+    first = "Fetching layer 1 of 12\nError: Cannot find module 'express'"
+    second = "Pulling cache\nUploading 3 files\nError: Cannot find module 'express'"
+
+    assert error_signature(first) == error_signature(second)
+
+
+def test_error_signature_ignores_order_and_repeats():
+    first = "ERROR: port in use\nTraceback: boom\nERROR: port in use"
+    second = "Traceback: boom\nERROR: port in use"
+
+    assert error_signature(first) == error_signature(second)
+
+
+def test_error_signature_separates_different_failures():
+    assert error_signature("Error: Cannot find module 'express'") != error_signature("Error: EADDRINUSE")
+
+
+def test_error_signature_falls_back_to_all_lines_without_errors():
+    assert error_signature("container exited 1\nhealthz timeout") != error_signature("build step 2 hung")
+    assert error_signature("container exited 1") == error_signature("container exited 137")
+
+
+def fill(log, *lines):
+    for line in lines:
+        log.append(line.encode() + b"\n")
+
+
+def test_log_short_enough_renders_whole():
+    log = LogRingBuffer(tail_lines=5, error_lines=3)
+    fill(log, "one", "error: two", "three")
+
+    assert log.render() == "one\nerror: two\nthree"
+
+
+def test_log_keeps_evicted_errors_ahead_of_an_error_heavy_tail():
+    log = LogRingBuffer(tail_lines=5, error_lines=3)
+    fill(log, "early error 1", "early error 2")
+    fill(log, *(f"info {i}" for i in range(20)))
+    fill(log, *(f"tail error {i}" for i in range(5)))
+
+    assert log.render().splitlines() == [
+        "early error 1",
+        "early error 2",
+        "... 20 lines omitted ...",
+        *(f"tail error {i}" for i in range(5)),
+    ]
+
+
+def test_log_keeps_the_first_errors_once_the_cap_is_reached():
+    log = LogRingBuffer(tail_lines=2, error_lines=2)
+    fill(log, *(f"error {i}" for i in range(6)))
+
+    assert log.render().splitlines() == ["error 0", "error 1", "... 2 lines omitted ...", "error 4", "error 5"]
+
+
+def test_log_drains_a_stream():
+    async def drain():
+        stream = asyncio.StreamReader()
+        stream.feed_data(b"a\r\nb\n")
+        stream.feed_eof()
+        log = LogRingBuffer(tail_lines=5)
+        await log.drain(stream)
+        return log.render()
+
+    assert asyncio.run(drain()) == "a\nb"